@@ -1,13 +1,40 @@
 import sys
 import os
 import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import cloudscraper 
 import webbrowser 
 import re 
 import csv 
+import json
+import bisect
+import functools
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime 
-from bs4 import BeautifulSoup
+from html import escape as html_escape
+
+# lxml (libxml2) parses the JLCPCB pages much faster than html.parser; optional.
+# BeautifulSoup is only the fallback and is imported when first needed
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# requests-cache keeps vendor responses on disk for a few minutes; optional
+try:
+    from requests_cache import CachedSession
+except ImportError:
+    CachedSession = None
+
+# orjson (C extension) for the Mouser JSON payloads; stdlib json otherwise
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # --- XHTML2PDF FOR PDF GENERATION ---
 try:
@@ -17,22 +44,34 @@ except ImportError:
     sys.exit(1)
 
 # SQLAlchemy imports
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, Float
+from sqlalchemy import create_engine, event, select, insert, func, Column, Index, Integer, String, Text, ForeignKey, Float
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 
 # PyQt6 imports
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QTableWidget, QTableWidgetItem, QPushButton, QLabel, QLineEdit, 
+                             QTableView, QPushButton, QLabel, QLineEdit, 
                              QSplitter, QListWidget, QListWidgetItem, QDialog, QFormLayout, 
                              QMessageBox, QTextEdit, QAbstractItemView, QHeaderView, QInputDialog,
-                             QComboBox, QMenu, QFileDialog)
-from PyQt6.QtCore import Qt, QRunnable, QThreadPool, pyqtSignal, QObject, pyqtSlot, QSettings
-from PyQt6.QtGui import QColor, QPalette, QAction, QFont, QIcon
+                             QComboBox, QMenu, QFileDialog, QSpinBox)
+from PyQt6.QtCore import (Qt, QRunnable, QThreadPool, pyqtSignal, QObject, pyqtSlot, QSettings, QTimer,
+                          QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QRegularExpression)
+from PyQt6.QtGui import QColor, QBrush, QPalette, QAction, QFont, QIcon
 import qtawesome as qta 
 
 # =============================================================================
 # 0. HELPERS (PRICE PARSING)
 # =============================================================================
+_PRICE_CLEAN_RE = re.compile(r'[^\d.,]')
+_DIGITS_RE = re.compile(r'\d+')
+
+def _extract_int(text):
+    """
+    All the digits of a label glued together ('1,234 In Stock' -> 1234); 0 if none.
+    """
+    if not text: return 0
+    if text.isdigit(): return int(text) # e.g. Mouser's FactoryStock
+    return int(''.join(_DIGITS_RE.findall(text)) or 0)
+
 def safe_parse_price(price_str):
     """
     Safely converts a price string (e.g., '€ 1.200,50' or '$1,200.50') into a float.
@@ -41,9 +80,10 @@ def safe_parse_price(price_str):
     if not price_str: return 0.0
     
     # Remove currency symbols and spaces, keep digits, dots, and commas
-    clean = re.sub(r'[^\d.,]', '', str(price_str))
+    clean = _PRICE_CLEAN_RE.sub('', price_str if isinstance(price_str, str) else str(price_str))
     
     if not clean: return 0.0
+    if clean.isdigit(): return float(clean)
 
     # Heuristic for separators
     if ',' in clean and '.' in clean:
@@ -59,29 +99,159 @@ def safe_parse_price(price_str):
     except ValueError:
         return 0.0
 
+def _json_loads(raw):
+    return orjson.loads(raw) if orjson else json.loads(raw)
+
+def _json_dumps(obj):
+    return orjson.dumps(obj) if orjson else json.dumps(obj).encode()
+
+# Shared HTTP sessions: keep-alive connections are reused across every lookup
+# instead of paying a new TCP+TLS handshake per request.
+def _cacheable(response):
+    """
+    False for Mouser replies that carry API errors (bad key, quota): they come back
+    as HTTP 200 but must not be replayed from the cache.
+    """
+    if b'"Errors"' not in response.content: return True
+    try: return not _json_loads(response.content).get('Errors')
+    except ValueError: return True
+
+if CachedSession is not None:
+    # Identical Mouser queries (URL + JSON body) within 15 minutes are answered from disk
+    _HTTP = CachedSession('bom_http_cache', backend='sqlite', use_cache_dir=True, expire_after=900, filter_fn=_cacheable,
+                          allowable_methods=('GET', 'POST'), match_headers=False, stale_if_error=True)
+else:
+    _HTTP = requests.Session()
+_HTTP.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3)))
+_HTTP.headers.update({'User-Agent': 'BOMManager/1.0'})
+
+_SCRAPER = cloudscraper.create_scraper()
+
+class TTLCache:
+    """
+    Small thread-safe in-memory cache whose entries expire after a per-entry TTL (seconds).
+    """
+    def __init__(self):
+        self._data = {}; self._lock = threading.Lock()
+
+    def get_or_set(self, key, loader, ttl):
+        """
+        Cached value for key, or loader()'s result (stored unless it is None).
+        """
+        now = time.monotonic()
+        with self._lock: hit = self._data.get(key)
+        if hit and hit[0] > now: return hit[1]
+        value = loader()
+        if value is not None:
+            with self._lock: self._data[key] = (now + ttl, value)
+        return value
+
+    def pop(self, key):
+        with self._lock: self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock: self._data.clear()
+
+# Parsed JLCPCB pages (stock, price tiers) by part code. The scraper session is not
+# covered by the HTTP cache, and the tiers serve any quantity.
+_JLC_CACHE = TTLCache()
+JLC_CACHE_TTL = 300
+# code -> (ETag, Last-Modified, parsed result) for conditional re-fetches once the TTL ran out
+_JLC_VALIDATORS = {}
+
+# (vendor, part number) -> time.monotonic() of its last failed lookup (network or HTTP error).
+# Such parts are retried once LOOKUP_RETRY_DELAY has passed, not on every refresh or scroll
+_LOOKUP_FAILURES = {}
+LOOKUP_RETRY_DELAY = 600
+
+def _note_lookup(vendor, part_number, ok):
+    if not part_number: return
+    if ok: _LOOKUP_FAILURES.pop((vendor, part_number), None)
+    else: _LOOKUP_FAILURES[(vendor, part_number)] = time.monotonic()
+
+def clear_http_cache():
+    if CachedSession is not None: _HTTP.cache.clear()
+    _JLC_CACHE.clear(); _JLC_VALIDATORS.clear(); _LOOKUP_FAILURES.clear()
+
+# Upper bound on simultaneous requests per vendor, so a large BOM refresh
+# does not hammer the sites (or trip their rate limits).
+MAX_REQUESTS_PER_HOST = 5
+_MOUSER_SLOTS = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+_JLC_SLOTS = threading.BoundedSemaphore(MAX_REQUESTS_PER_HOST)
+
+# Refresh workers running at once, unless overridden in Settings ("worker_pool_size").
+# They mostly wait on the network, so the default is twice the core count
+DEFAULT_POOL_SIZE = min(16, 2 * (os.cpu_count() or 1))
+
+# Settings shared by the GUI-thread code. QSettings is reentrant but not thread-safe,
+# so code running on worker threads (CurrencyManager) keeps its own instances.
+APP_SETTINGS = QSettings("MySoft", "BOMManager")
+
 # =============================================================================
 # 1. CURRENCY MANAGER
 # =============================================================================
 class CurrencyManager:
+    TTL = 86400 # seconds a downloaded rate stays valid
+    RETRY_DELAY = 600 # after a failed download, keep the old rate this long before retrying
     _rate = None
     _last_update = 0
-    
-    @staticmethod
-    def get_usd_to_eur():
-        now = time.time()
-        if CurrencyManager._rate is None or (now - CurrencyManager._last_update) > 86400:
+    _loaded = False
+    _lock = threading.Lock() # one download at a time, however many workers miss together
+
+    @classmethod
+    def _load(cls):
+        """
+        Seeds the in-memory cache with the rate persisted by a previous session.
+        """
+        cls._loaded = True
+        settings = QSettings("MySoft", "BOMManager")
+        rate = settings.value("fx_usd_eur_rate", 0.0, type=float)
+        if rate > 0:
+            cls._rate = rate
+            cls._last_update = settings.value("fx_usd_eur_ts", 0.0, type=float)
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Marks the cached rate as expired so the next call downloads a fresh one.
+        The old rate is kept as a fallback in case the download fails.
+        """
+        with cls._lock:
+            if not cls._loaded: cls._load()
+            cls._last_update = 0
+        QSettings("MySoft", "BOMManager").remove("fx_usd_eur_ts")
+
+    @classmethod
+    def _fresh(cls, now):
+        return cls._loaded and cls._rate is not None and (now - cls._last_update) <= cls.TTL
+
+    @classmethod
+    def get_usd_to_eur(cls):
+        if cls._fresh(time.time()): return cls._rate
+        with cls._lock:
+            if not cls._loaded: cls._load()
+            now = time.time()
+            # Another worker may have refreshed the rate while we waited for the lock
+            if cls._fresh(now): return cls._rate
             try:
                 url = "https://open.er-api.com/v6/latest/USD"
-                response = requests.get(url, timeout=5)
+                response = _HTTP.get(url, timeout=5)
                 if response.status_code == 200:
-                    data = response.json()
-                    CurrencyManager._rate = data['rates']['EUR']
-                    CurrencyManager._last_update = now
+                    data = _json_loads(response.content)
+                    cls._rate = data['rates']['EUR']
+                    cls._last_update = now
+                    settings = QSettings("MySoft", "BOMManager")
+                    settings.setValue("fx_usd_eur_rate", cls._rate)
+                    settings.setValue("fx_usd_eur_ts", now)
             except Exception as e:
-                if CurrencyManager._rate is None: 
-                    CurrencyManager._rate = 0.92 
-                    print(f"Error retrieving rate: {e}")
-        return CurrencyManager._rate
+                if cls._rate is None: print(f"Error retrieving rate: {e}")
+            if cls._last_update != now:
+                # Failed (error or bad status): serve the old or default rate for a while instead
+                # of making every following lookup wait on another timeout. In memory only,
+                # the persisted timestamp stays the real one
+                if cls._rate is None: cls._rate = 0.92
+                cls._last_update = now - cls.TTL + cls.RETRY_DELAY
+        return cls._rate
 
 # =============================================================================
 # 2. DATABASE MODELS
@@ -98,10 +268,10 @@ class Project(Base):
 class Component(Base):
     __tablename__ = 'components'
     id = Column(Integer, primary_key=True)
-    project_id = Column(Integer, ForeignKey('projects.id'))
+    project_id = Column(Integer, ForeignKey('projects.id'), index=True)
     
-    mouser_part_number = Column(String)
-    jlc_part_number = Column(String)
+    mouser_part_number = Column(String, index=True)
+    jlc_part_number = Column(String, index=True)
     description = Column(String)
     category = Column(String, default="Other")
     target_qty = Column(Integer, default=1)
@@ -115,84 +285,252 @@ class Component(Base):
     
     project = relationship("Project", back_populates="components")
 
+    # The per-project "JLC Stock" sort, without touching other projects' rows
+    # (the category filter runs in the view's proxy model, not in SQL)
+    __table_args__ = (Index('ix_comp_pid_jlc_stock', 'project_id', 'last_jlc_stock'),)
+
 CATEGORIES = ["All", "Resistor", "Capacitor", "Inductor", "IC", "Microcontroller", 
               "Connector", "Transistor", "Diode", "Sensor", "Module", "Other"] 
+# Real categories (no "All" filter entry), for membership checks
+CATEGORY_SET = frozenset(CATEGORIES[1:])
+
+def needs_refresh(component, ttl_hours=24):
+    """
+    True when the cached vendor data of a component is missing or older than ttl_hours.
+    After a failed lookup the part waits LOOKUP_RETRY_DELAY instead; "no API key" or
+    "part not listed" are answers, not failures, and follow the normal TTL.
+    """
+    failed = [_LOOKUP_FAILURES.get(k) for k in (('mouser', component.mouser_part_number), ('jlc', component.jlc_part_number))]
+    failed = [t for t in failed if t is not None]
+    if failed: return time.monotonic() - min(failed) > LOOKUP_RETRY_DELAY
+    if not component.last_update: return True
+    try:
+        last = datetime.strptime(component.last_update, "%Y-%m-%d %H:%M")
+    except ValueError:
+        return True
+    return (datetime.now() - last).total_seconds() > ttl_hours * 3600
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    """
+    WAL lets the UI read while results are written; synchronous=NORMAL is still
+    crash-safe in WAL mode and avoids an fsync on every commit (slow on synced folders).
+    """
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-65536") # 64 MiB page cache
+    cur.execute("PRAGMA mmap_size=268435456") # reads straight from a 256 MiB memory map
+    cur.close()
+
+# Bump whenever tables or indexes change, so existing databases get upgraded by init_db
+SCHEMA_VERSION = 3
 
 def init_db(db_path):
-    if not os.path.exists(db_path): pass
+    if not os.path.exists(db_path): raise FileNotFoundError(f"Database file not found: {db_path}")
     db_url = f"sqlite:///{db_path}"
-    engine = create_engine(db_url)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)
+    engine = create_engine(db_url, connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", _sqlite_pragmas)
+    with engine.connect() as conn: version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    if version < SCHEMA_VERSION:
+        Base.metadata.create_all(engine)
+        # create_all() skips indexes of tables that already exist (databases from older versions)
+        for idx in Component.__table__.indexes: idx.create(engine, checkfirst=True)
+        # Unused (project_id, category) index of version 2: it only slowed down writes
+        with engine.begin() as conn: conn.exec_driver_sql("DROP INDEX IF EXISTS ix_comp_pid_cat")
+        with engine.begin() as conn: conn.exec_driver_sql(f"PRAGMA user_version={SCHEMA_VERSION}")
+    # Only the GUI thread uses the session (workers never touch the DB), so loaded rows can
+    # stay valid across commits instead of being re-SELECTed on the next attribute access
+    return sessionmaker(bind=engine, expire_on_commit=False)
 
 # =============================================================================
 # 3. SEARCH FUNCTIONS (UPDATED & ROBUST)
 # =============================================================================
 
-def get_jlcpcb_stats(code, qnty):
+_XPATH_NS = {'re': 'http://exslt.org/regular-expressions'}
+_JLC_STOCK_LABEL_RE = re.compile("Stock", re.IGNORECASE)
+_JLC_PRICE_CLASS_RE = re.compile(r'price|cost', re.IGNORECASE)
+_JLC_TIER_RE = re.compile(r'(\d+)\+\s*\$(\d+\.\d+)')
+# Stock count embedded in the page's JSON state, matched on the raw bytes
+_JLC_STOCK_JSON_RE = re.compile(rb'"stockNumber"\s*:\s*(\d+)')
+_JLC_TIER_RE_B = re.compile(rb'(\d+)\+\s*\$(\d+\.\d+)')
+
+# After an early stop, up to this many bytes of the rest are still read
+_JLC_DRAIN_LIMIT = 256 * 1024
+
+def _read_jlc_page(response):
     """
-    Robust scraping using cloudscraper and flexible parsing.
+    Downloads a streamed part page, stopping early once the stock JSON has arrived
+    and the price table is complete (a chunk after the first tiers adds no new tier).
+    Falls back to the whole page when the markers never show up.
+    After an early stop, a remainder up to _JLC_DRAIN_LIMIT is read and discarded so the
+    keep-alive connection returns to the pool; a longer one is cheaper to drop (the next
+    page then pays a new handshake).
+    """
+    buf = bytearray(); has_stock = False; tiers_seen = 0; n = 0; tier_pos = 0; stopped = False
+    chunks = response.iter_content(16384)
+    try:
+        for chunk in chunks:
+            # Only the new bytes are scanned (plus a small overlap for a marker split across chunks)
+            start = max(0, len(buf) - 64)
+            buf += chunk
+            has_stock = has_stock or _JLC_STOCK_JSON_RE.search(buf, start) is not None
+            for m in _JLC_TIER_RE_B.finditer(buf, tier_pos): n += 1; tier_pos = m.end()
+            # Also when no tier matched yet: the next scan starts in the overlap, not at byte 0
+            tier_pos = max(tier_pos, len(buf) - 64)
+            if has_stock:
+                if n and n == tiers_seen: stopped = True; break
+                tiers_seen = n
+    finally:
+        if stopped:
+            left = _JLC_DRAIN_LIMIT
+            try:
+                for chunk in chunks:
+                    left -= len(chunk)
+                    if left < 0: break
+            except Exception: pass
+        # Once the body was read to the end, close() releases the connection instead of closing it
+        response.close()
+    return bytes(buf)
+
+def _parse_jlc_page(page, want_stock=True):
+    """
+    Extracts the raw text of the 'Stock' label (None if missing or not wanted) and
+    of the price section (whole page if missing) from a JLCPCB part page.
+    The page is passed as raw bytes: both parsers decode it themselves in one pass.
+    """
+    if lxml_html is not None:
+        root = lxml_html.fromstring(page)
+        stock_text = None
+        labels = root.xpath("//text()[re:test(., 'stock', 'i')]", namespaces=_XPATH_NS) if want_stock else None
+        if labels:
+            el = labels[0].getparent()
+            if labels[0].is_tail: el = el.getparent()
+            stock_text = el.text_content()
+        sections = root.xpath("//div[re:test(@class, 'price|cost', 'i')]", namespaces=_XPATH_NS)
+        price_text = (sections[0] if sections else root).text_content()
+        return stock_text, price_text
+
+    from bs4 import BeautifulSoup, SoupStrainer
+    if not want_stock:
+        # Only the price section is needed: build just those subtrees, not the whole DOM
+        section = BeautifulSoup(page, 'html.parser', parse_only=SoupStrainer('div', class_=_JLC_PRICE_CLASS_RE)).find('div')
+        if section: return None, section.get_text()
+    soup = BeautifulSoup(page, 'html.parser')
+    stock_label = soup.find(string=_JLC_STOCK_LABEL_RE) if want_stock else None
+    stock_text = stock_label.parent.get_text() if stock_label else None
+    price_section = soup.find('div', class_=_JLC_PRICE_CLASS_RE)
+    if not price_section: price_section = soup
+    return stock_text, price_section.get_text()
+
+def _tier_unit_price(tiers, qty):
+    """
+    Unit price of the last break whose minimum quantity is <= qty, from a list of
+    (min_qty, unit_price) sorted by min_qty. Below the first break, the first price applies.
+    """
+    if not tiers: return 0.0
+    idx = bisect.bisect_right(tiers, (qty, float('inf'))) - 1
+    return tiers[max(idx, 0)][1]
+
+def price_for_qty(tiers, qty, presorted=False):
+    """
+    Total price for qty pieces given the vendor's (min_qty, unit_price) breaks, in any order
+    (pass presorted=True when they are already sorted by min_qty).
+    A break that parsed to a zero price falls back to the first break.
+    """
+    if not presorted: tiers = sorted(tiers, key=itemgetter(0))
+    unit = _tier_unit_price(tiers, qty)
+    if unit == 0 and tiers: unit = tiers[0][1]
+    return unit * qty
+
+def _fetch_jlc_part(code):
+    """
+    Downloads and parses a JLCPCB part page into (stock, [(min_qty, unit_price_usd), ...]).
+    (-1, []) when the part is not listed or its page cannot be parsed; None when the
+    page could not be downloaded.
     """
-    if not code: return [-1, 0.0]
-    
     url = "https://jlcpcb.com/partdetail/" + code
+    # If the page did not change since the last download, a 304 saves the body and the parsing
+    known = _JLC_VALIDATORS.get(code)
+    headers = {}
+    if known and known[0]: headers['If-None-Match'] = known[0]
+    if known and known[1]: headers['If-Modified-Since'] = known[1]
     
     try:
-        scraper = cloudscraper.create_scraper() 
-        response = scraper.get(url, timeout=15)
-        response.raise_for_status()
+        with _JLC_SLOTS:
+            response = _SCRAPER.get(url, timeout=15, stream=True, headers=headers)
+            if response.status_code == 304 and known: response.close(); return known[2]
+            if response.status_code == 404: response.close(); return -1, [] # code not listed
+            response.raise_for_status()
+            page = _read_jlc_page(response)
     except Exception as e:
         print(f"JLCPCB Connection Error for {code}: {e}")
-        return [-1, 0.0]
+        return None
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+    # Fast path: stock straight from the embedded JSON, without walking the DOM for the label
+    stock_match = _JLC_STOCK_JSON_RE.search(page)
+    try:
+        stock_text, text_content = _parse_jlc_page(page, want_stock=stock_match is None)
+    except Exception as e:
+        print(f"JLCPCB Parsing Error for {code}: {e}")
+        return -1, []
     quantity = 0
-    total_price_usd = 0.0
+    tiers = []
 
     # 1. Stock Parsing
     try:
-        stock_label = soup.find(string=re.compile("Stock", re.IGNORECASE))
-        if stock_label:
-            parent_text = stock_label.parent.get_text()
-            quantity = int(''.join(filter(str.isdigit, parent_text)))
+        if stock_match:
+            quantity = int(stock_match.group(1))
+        elif stock_text:
+            quantity = _extract_int(stock_text)
     except: quantity = 0
     
     # 2. Price Parsing
     try:
-        price_section = soup.find('div', class_=re.compile(r'price|cost', re.IGNORECASE))
-        if not price_section: price_section = soup
-        text_content = price_section.get_text()
-        
-        matches = re.findall(r'(\d+)\+\s*\$(\d+\.\d+)', text_content)
-        tiers = []
-        for qty_str, price_str in matches:
-            tiers.append((int(qty_str), float(price_str)))
-        tiers.sort(key=lambda x: x[0])
-        
-        if tiers:
-            target_unit_price = tiers[0][1]
-            for qty_tier, price_tier in tiers:
-                if qnty >= qty_tier: target_unit_price = price_tier
-                else: break 
-            total_price_usd = qnty * target_unit_price
+        # Sorted once here: the cached tiers then serve every quantity without re-sorting
+        tiers = sorted(((int(qty_str), float(price_str)) for qty_str, price_str in _JLC_TIER_RE.findall(text_content)), key=itemgetter(0))
     except: pass
 
+    etag = response.headers.get('ETag'); modified = response.headers.get('Last-Modified')
+    if etag or modified: _JLC_VALIDATORS[code] = (etag, modified, (quantity, tiers))
+    return quantity, tiers
+
+def get_jlcpcb_stats(code, qnty, force=False):
+    """
+    Robust scraping using cloudscraper and flexible parsing.
+    Pages are reused for JLC_CACHE_TTL seconds, whatever the quantity asked (force=True downloads it again).
+    [-1, 0.0] when there is no code or it is not listed; None when the page could not be downloaded.
+    """
+    if not code: return [-1, 0.0]
+    if force: _JLC_CACHE.pop(code); _JLC_VALIDATORS.pop(code, None)
+    part = _JLC_CACHE.get_or_set(code, lambda: _fetch_jlc_part(code), JLC_CACHE_TTL)
+    if part is None: return None
+    quantity, tiers = part
+    if quantity < 0: return [-1, 0.0]
+    total_price_usd = 0.0
+    try: total_price_usd = price_for_qty(tiers, qnty, presorted=True)
+    except: pass
     return [quantity, total_price_usd * CurrencyManager.get_usd_to_eur()]
 
-def get_mouser_stats(part_number, qty, api_key):
+def get_mouser_stats(part_number, qty, api_key, force=False):
     """
     Mouser API with Price Parsing Fix and PN Matching.
+    force=True skips the HTTP cache (the fresh reply replaces the cached one).
+    [-1, 0.0] without a PN or API key, or when the part is not found; None when the
+    request failed (network, HTTP status, or an API error such as an exhausted quota).
     """
     if not part_number or not api_key: return [-1, 0.0]
-    url = f"https://api.mouser.com/api/v1/search/keyword?apiKey={api_key}"
+    url = f"https://api.mouser.com/api/v1/search/partnumber?apiKey={api_key}"
     headers = {'Content-Type': 'application/json'}
-    body = {"SearchByKeywordRequest": {"keyword": part_number, "records": 5, "startingRecord": 0, "searchOptions": "None"}}
+    # Part-number search returns only parts matching the PN, not a full keyword result page
+    body = {"SearchByPartRequest": {"mouserPartNumber": part_number, "partSearchOptions": "None"}}
     
     try:
-        r = requests.post(url, json=body, headers=headers, timeout=10)
+        extra = {'force_refresh': True} if force and CachedSession is not None else {}
+        with _MOUSER_SLOTS: r = _HTTP.post(url, data=_json_dumps(body), headers=headers, timeout=10, **extra)
         if r.status_code == 200:
-            data = r.json()
-            if data.get('Errors'): return [-1, 0.0]
+            data = _json_loads(r.content)
+            if data.get('Errors'): return None
             
             results = data.get('SearchResults', {}).get('Parts', [])
             if results:
@@ -207,50 +545,94 @@ def get_mouser_stats(part_number, qty, api_key):
                 
                 avail_str = str(part.get('Availability', '0'))
                 if avail_str == 'None': avail_str = str(part.get('FactoryStock', '0'))
-                stock = int(''.join(filter(str.isdigit, avail_str)) or 0)
-                
-                price_unit = 0.0
-                breaks = part.get('PriceBreaks', [])
-                for pb in breaks:
-                    if qty >= int(pb.get('Quantity', 99999)):
-                        price_unit = safe_parse_price(pb.get('Price', '0'))
+                stock = _extract_int(avail_str)
                 
-                if price_unit == 0 and breaks:
-                     price_unit = safe_parse_price(breaks[0].get('Price', '0'))
+                tiers = [(int(pb.get('Quantity', 99999)), safe_parse_price(pb.get('Price', '0'))) for pb in part.get('PriceBreaks', [])]
                      
-                return [stock, price_unit * qty]
+                return [stock, price_for_qty(tiers, qty)]
+            return [-1, 0.0]
     except Exception as e:
         print(f"Mouser API Error: {e}")
         
-    return [-1, 0.0]
+    return None
 
 # =============================================================================
 # 4. WORKER THREAD
 # =============================================================================
+# Mouser and JLCPCB live on different hosts, so each component queries both at once.
+# Only JLCPCB fetches run here, so the pool is sized to the per-host limit: no thread
+# ever sits parked on _JLC_SLOTS
+_NET_POOL = ThreadPoolExecutor(max_workers=MAX_REQUESTS_PER_HOST, thread_name_prefix="jlc")
+
 class WorkerSignals(QObject):
     result = pyqtSignal(dict) 
 
 class DataUpdater(QRunnable):
-    def __init__(self, component_id, mouser_pn, jlc_pn, qty):
+    def __init__(self, component_ids, mouser_pn, jlc_pn, qty, api_key, timestamp, signals, force=False):
+        super().__init__()
+        self.c_ids = component_ids; self.m_pn = mouser_pn; self.j_pn = jlc_pn; self.qty = qty
+        # signals is shared by every worker of the window (one QObject, connected once)
+        self.api_key = api_key; self.timestamp = timestamp; self.signals = signals
+        self.force = force # bypass the vendor caches (explicit "Refresh Selected")
+
+    @pyqtSlot()
+    def run(self):
+        # JLCPCB goes to the shared pool while this thread handles Mouser itself,
+        # instead of sitting idle waiting on two futures
+        try:
+            fj = _NET_POOL.submit(get_jlcpcb_stats, self.j_pn, self.qty, self.force)
+            m_res = get_mouser_stats(self.m_pn, self.qty, self.api_key, self.force)
+            j_res = fj.result()
+        except Exception as e:
+            # Every id must still get a result, or its row stays "Updating..." and the batch never ends
+            print(f"Refresh Error for {self.m_pn} / {self.j_pn}: {e}")
+            m_res = j_res = None
+        _note_lookup('mouser', self.m_pn, m_res is not None); _note_lookup('jlc', self.j_pn, j_res is not None)
+        # A failed vendor keeps its stored values, and the row keeps its old timestamp
+        stamp = self.timestamp if m_res is not None and j_res is not None else None
+        m_res = m_res or [None, None]; j_res = j_res or [None, None]
+        # Rows sharing the same parts and quantity all get this one answer
+        for c_id in self.c_ids:
+            self.signals.result.emit({
+                'id': c_id, 
+                'mouser_stock': m_res[0], 'mouser_price': m_res[1], 
+                'jlc_stock': j_res[0], 'jlc_price': j_res[1],
+                'timestamp': stamp
+            })
+
+class ExportSignals(QObject):
+    done = pyqtSignal(str, bool, str) # path, ok, error message
+
+class ExportWorker(QRunnable):
+    """
+    Writes an export built on the GUI thread: a list of CSV rows or a PDF's HTML.
+    Only plain data is handed over, never ORM objects.
+    """
+    def __init__(self, path, rows=None, html=None):
         super().__init__()
-        self.c_id = component_id; self.m_pn = mouser_pn; self.j_pn = jlc_pn; self.qty = qty
-        self.signals = WorkerSignals(); self.settings = QSettings("MySoft", "BOMManager")
+        self.path = path; self.rows = rows; self.html = html; self.signals = ExportSignals()
 
     @pyqtSlot()
     def run(self):
-        m_res = get_mouser_stats(self.m_pn, self.qty, self.settings.value("mouser_key", "").strip())
-        j_res = get_jlcpcb_stats(self.j_pn, self.qty)
-        now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-        self.signals.result.emit({
-            'id': self.c_id, 
-            'mouser_stock': m_res[0], 'mouser_price': m_res[1], 
-            'jlc_stock': j_res[0], 'jlc_price': j_res[1],
-            'timestamp': now_str
-        })
+        try:
+            if self.html is None:
+                with open(self.path, 'w', newline='', encoding='utf-8', buffering=1024*1024) as f: csv.writer(f).writerows(self.rows)
+                self.signals.done.emit(self.path, True, "")
+            else:
+                with open(self.path, "wb") as pdf_file: pisa_status = pisa.CreatePDF(self.html, dest=pdf_file)
+                self.signals.done.emit(self.path, not pisa_status.err, "Error creating PDF" if pisa_status.err else "")
+        except Exception as e: self.signals.done.emit(self.path, False, str(e))
 
 # =============================================================================
 # 5. UI DIALOGS
 # =============================================================================
+@functools.lru_cache(maxsize=128)
+def _icon(name, color=None):
+    """
+    qtawesome icons are rendered from the font on every call; build each one only once.
+    """
+    return qta.icon(name, color=color) if color else qta.icon(name)
+
 class NotesDialog(QDialog):
     def __init__(self, parent=None, project=None):
         super().__init__(parent)
@@ -269,6 +651,12 @@ class NotesDialog(QDialog):
         self.session.commit()
         self.accept()
 
+# Drops line breaks from single-line fields in one C pass
+_NO_NEWLINES = str.maketrans('', '', '\r\n')
+
+def _one_line(text):
+    return text.translate(_NO_NEWLINES) if text else ""
+
 class ComponentDialog(QDialog):
     def __init__(self, parent=None, component=None):
         super().__init__(parent)
@@ -284,9 +672,9 @@ class ComponentDialog(QDialog):
         self.inp_backup = QLineEdit()
         
         if component:
-            self.inp_m_pn.setText(component.mouser_part_number.replace("\n","") if component.mouser_part_number else "")
-            self.inp_j_pn.setText(component.jlc_part_number.replace("\n","") if component.jlc_part_number else "")
-            self.inp_desc.setText(component.description.replace("\n","") if component.description else "")
+            self.inp_m_pn.setText(_one_line(component.mouser_part_number))
+            self.inp_j_pn.setText(_one_line(component.jlc_part_number))
+            self.inp_desc.setText(_one_line(component.description))
             self.inp_qty.setText(str(component.target_qty))
             self.inp_backup.setText(component.backup_part or "")
             idx = self.inp_cat.findText(component.category)
@@ -300,8 +688,9 @@ class ComponentDialog(QDialog):
         self.layout.addRow("Backup:", self.inp_backup)
         
         ll = QHBoxLayout()
-        b_m = QPushButton(qta.icon('fa5s.external-link-alt'), "Open Mouser"); b_m.clicked.connect(lambda: self.open_l(f"https://www.mouser.it/c/?q={self.inp_m_pn.text()}"))
-        b_j = QPushButton(qta.icon('fa5s.external-link-alt'), "Open JLCPCB"); b_j.clicked.connect(lambda: self.open_l(f"https://jlcpcb.com/partdetail/{self.inp_j_pn.text()}"))
+        link_icon = _icon('fa5s.external-link-alt')
+        b_m = QPushButton(link_icon, "Open Mouser"); b_m.clicked.connect(lambda: self.open_l(f"https://www.mouser.it/c/?q={self.inp_m_pn.text()}"))
+        b_j = QPushButton(link_icon, "Open JLCPCB"); b_j.clicked.connect(lambda: self.open_l(f"https://jlcpcb.com/partdetail/{self.inp_j_pn.text()}"))
         ll.addWidget(b_m); ll.addWidget(b_j)
         self.layout.addRow(QLabel("Links:"), ll)
 
@@ -315,19 +704,24 @@ class ComponentDialog(QDialog):
         if url.split('=')[-1] and url.split('/')[-1]: webbrowser.open(url)
 
     def get_data(self):
-        return {'cat': self.inp_cat.currentText(), 'm_pn': self.inp_m_pn.text().replace("\n",""), 'j_pn': self.inp_j_pn.text().replace("\n",""), 'desc': self.inp_desc.text().replace("\n",""), 'qty': int(self.inp_qty.text()) if self.inp_qty.text().isdigit() else 1, 'backup': self.inp_backup.text()}
+        return {'cat': self.inp_cat.currentText(), 'm_pn': _one_line(self.inp_m_pn.text()), 'j_pn': _one_line(self.inp_j_pn.text()), 'desc': _one_line(self.inp_desc.text()), 'qty': int(self.inp_qty.text()) if self.inp_qty.text().isdigit() else 1, 'backup': self.inp_backup.text()}
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Settings")
         self.resize(500, 250)
-        self.settings = QSettings("MySoft", "BOMManager")
+        self.settings = APP_SETTINGS
         layout = QVBoxLayout(self)
         form = QFormLayout()
         
         self.i_m = QLineEdit(self.settings.value("mouser_key", ""))
         form.addRow("Mouser API Key:", self.i_m)
+
+        self.i_pool = QSpinBox(); self.i_pool.setRange(1, 32)
+        self.i_pool.setValue(self.settings.value("worker_pool_size", DEFAULT_POOL_SIZE, type=int))
+        self.i_pool.setToolTip("Components refreshed in parallel")
+        form.addRow("Parallel Refreshes:", self.i_pool)
         
         current_db = self.settings.value("db_path", "Not Set")
         self.lbl_db = QLabel(current_db)
@@ -344,6 +738,11 @@ class SettingsDialog(QDialog):
         btn_new_db.clicked.connect(self.create_new_db)
         db_btn_layout.addWidget(btn_open_db); db_btn_layout.addWidget(btn_new_db)
         layout.addLayout(db_btn_layout)
+        
+        btn_cache = QPushButton("Clear Cached Data")
+        btn_cache.setToolTip("Forget the cached USD/EUR exchange rate and vendor responses")
+        btn_cache.clicked.connect(self.clear_cache)
+        layout.addWidget(btn_cache)
         layout.addStretch()
         
         b_save = QPushButton("Save and Close")
@@ -364,14 +763,148 @@ class SettingsDialog(QDialog):
             self.lbl_db.setText(file_path)
             QMessageBox.warning(self, "Restart Required", "New path set.\nPlease restart the application.")
 
+    def clear_cache(self):
+        CurrencyManager.invalidate()
+        clear_http_cache()
+        QMessageBox.information(self, "Cache", "Cached data cleared.\nPrices and exchange rate will be downloaded again on the next refresh.")
+
     def save_settings(self):
         self.settings.setValue("mouser_key", self.i_m.text().strip())
+        self.settings.setValue("worker_pool_size", self.i_pool.value())
         self.accept()
 
 # =============================================================================
-# 6. MAIN WINDOW
+# 6. BOM TABLE MODEL
 # =============================================================================
+# Foregrounds of the vendor cells, built once instead of parsed on every paint. Brushes,
+# because that is what the delegate reads: a QColor would be converted on every paint
+_COL_OK = QBrush(QColor("#aaddaa")); _COL_BAD = QBrush(QColor("#ff5555")); _COL_NA = QBrush(QColor("#777"))
+
+class BomTableModel(QAbstractTableModel):
+    """
+    Read-only model over the project's Component objects. Cells are computed
+    lazily in data(), so only the rows actually painted by the view cost anything.
+    """
+    COLUMNS = ["ID", "Mouser PN", "JLC Code", "Cat", "Desc", "Qty", "Mouser", "JLCPCB"]
+
+    def __init__(self, updating, parent=None):
+        super().__init__(parent)
+        self._comps = []; self._rows = {}
+        self._cells = {} # row -> (mouser text, mouser color, jlc text, jlc color), built on first paint
+        self.updating = updating # ids whose vendor data is being refreshed
+
+    def set_components(self, comps):
+        self.beginResetModel()
+        self._comps = comps; self._rows = {c.id: r for r, c in enumerate(comps)}; self._cells = {}
+        self.endResetModel()
+
+    def component(self, row):
+        return self._comps[row]
+
+    def components(self):
+        return self._comps
+
+    def component_by_id(self, cid):
+        r = self._rows.get(cid)
+        return None if r is None else self._comps[r]
+
+    def rows_for_ids(self, ids):
+        return [self._rows[i] for i in ids if i in self._rows]
+
+    def refresh_rows(self, rows):
+        """
+        Notifies the view that the vendor columns of these rows changed.
+        """
+        if not rows: return
+        for r in rows: self._cells.pop(r, None)
+        self.dataChanged.emit(self.index(min(rows), 6), self.index(max(rows), 7))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._comps)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole: return self.COLUMNS[section]
+        return None
+
+    @staticmethod
+    def vendor_text(stock, price, qty):
+        if stock >= qty: return f"📦{stock}\n{price:.2f}€"
+        if stock > -1: return f"NO STOCK\n({stock})"
+        return "N/A"
+
+    @staticmethod
+    def vendor_color(stock, qty):
+        if stock >= qty: return _COL_OK
+        if stock > -1: return _COL_BAD
+        return _COL_NA
+
+    def vendor_cells(self, row):
+        """
+        Derived vendor cells of a row, computed once and reused by every later paint
+        until refresh_rows or a reset drops them.
+        """
+        cells = self._cells.get(row)
+        if cells is None:
+            c = self._comps[row]
+            cells = self._cells[row] = (self.vendor_text(c.last_mouser_stock, c.last_mouser_price, c.target_qty),
+                                        self.vendor_color(c.last_mouser_stock, c.target_qty),
+                                        self.vendor_text(c.last_jlc_stock, c.last_jlc_price, c.target_qty),
+                                        self.vendor_color(c.last_jlc_stock, c.target_qty))
+        return cells
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        c = self._comps[index.row()]; col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0: return str(c.id)
+            if col == 1: return c.mouser_part_number or ""
+            if col == 2: return c.jlc_part_number or ""
+            if col == 3: return c.category
+            if col == 4: return c.description or ""
+            if col == 5: return str(c.target_qty)
+            if c.id in self.updating: return "Updating..."
+            return self.vendor_cells(index.row())[0 if col == 6 else 2]
+        if role == Qt.ItemDataRole.ForegroundRole and col >= 6:
+            return self.vendor_cells(index.row())[1 if col == 6 else 3]
+        return None
+
+# =============================================================================
+# 7. MAIN WINDOW
+# =============================================================================
+# One component card of the PDF export, filled with a single %-substitution per component
+PDF_CARD_TEMPLATE = """
+<div class="card">
+    <div class="card-header">
+        <table width="100%%">
+            <tr>
+                <td width="85%%"><div><span class="cat-badge">%(category)s</span> <span class="desc">%(description)s</span></div></td>
+                <td width="15%%" align="right"><div class="qty-line"><b>x%(qty)s</b></div></td>
+            </tr>
+        </table>
+    </div>
+    <table class="card-body" cellspacing="2">
+        <tr>
+            <td width="50%%" class="vendor-box" style="background-color: %(m_bg)s; border: %(m_border)s;">
+                <div class="row-flex"><span class="v-title" style="color:#2e7d32;">MOUSER</span><span class="pn">%(mouser_pn)s</span></div>
+                <div class="metrics-row">Stk: <span style="%(m_stk_style)s">%(m_stk_txt)s</span> | Unit: %(m_unit)s</div>
+                <div class="total-price">TOT: %(m_price)s</div>
+            </td>
+            <td width="50%%" class="vendor-box" style="background-color: %(j_bg)s; border: %(j_border)s;">
+                <div class="row-flex"><span class="v-title" style="color:#1565c0;">JLCPCB</span><span class="pn">%(jlc_pn)s</span></div>
+                <div class="metrics-row">Stk: <span style="%(j_stk_style)s">%(j_stk_txt)s</span> | Unit: %(j_unit)s</div>
+                <div class="total-price">TOT: %(j_price)s</div>
+            </td>
+        </tr>
+    </table>
+</div>
+"""
+
 class MainWindow(QMainWindow):
+    COMMIT_BATCH = 50
+
     def __init__(self, session_factory):
         super().__init__()
         self.setWindowTitle("BOM Manager Pro")
@@ -379,8 +912,24 @@ class MainWindow(QMainWindow):
         self.resize(1350, 850)
         self.session = session_factory()
         self.threadpool = QThreadPool()
+        self.threadpool.setMaxThreadCount(APP_SETTINGS.value("worker_pool_size", DEFAULT_POOL_SIZE, type=int))
+        # Exports get their own thread, so they never queue behind a refresh batch
+        self.export_pool = QThreadPool(self); self.export_pool.setMaxThreadCount(1)
+        self._results = WorkerSignals(); self._results.result.connect(self.update_db_and_ui)
         self.current_project = None
         self.tm = 0.0; self.tj = 0.0; self.hybrid_total = 0.0
+        self._contrib = {} # component id -> (mouser, jlc, hybrid) share of the totals
+        # Refresh results are committed together: once every worker has answered,
+        # or while results are still streaming in, once per second or every COMMIT_BATCH results
+        self._pending_results = 0
+        self._unsaved = 0
+        self._commit_timer = QTimer(self); self._commit_timer.setSingleShot(True); self._commit_timer.setInterval(1000)
+        self._commit_timer.timeout.connect(self.commit_results)
+        # Rows touched by refresh results are repainted in batches every 200 ms
+        self._dirty_ids = set()
+        self._in_flight = set()
+        self._ui_timer = QTimer(self); self._ui_timer.setSingleShot(True); self._ui_timer.setInterval(200)
+        self._ui_timer.timeout.connect(self.flush_ui)
         self.init_ui()
         self.load_projects()
 
@@ -410,28 +959,32 @@ class MainWindow(QMainWindow):
         self.lbl_t = QLabel("Select Project"); self.lbl_t.setStyleSheet("font-size:18px; font-weight:bold; border:none; background:none;")
         hl.addWidget(self.lbl_t)
         
-        btn_edit = QPushButton(qta.icon('fa5s.pen'), "")
+        btn_edit = QPushButton(_icon('fa5s.pen'), "")
         btn_edit.setToolTip("Rename Project"); btn_edit.setFixedSize(30, 30); btn_edit.clicked.connect(self.rename_project)
         hl.addWidget(btn_edit)
 
-        btn_notes = QPushButton(qta.icon('fa5s.sticky-note', color="#FFC107"), "")
+        btn_notes = QPushButton(_icon('fa5s.sticky-note', color="#FFC107"), "")
         btn_notes.setToolTip("Project Notes"); btn_notes.setFixedSize(30, 30); btn_notes.clicked.connect(self.open_notes)
         hl.addWidget(btn_notes)
         hl.addStretch()
 
         # Export
-        btn_exp = QPushButton(qta.icon('fa5s.file-export'), "Export")
+        self.btn_exp = btn_exp = QPushButton(_icon('fa5s.file-export'), "Export")
         menu_exp = QMenu()
         act_csv = QAction("Export CSV (Detailed)", self); act_csv.triggered.connect(self.export_csv)
         act_pdf = QAction("Export PDF (Landscape)", self); act_pdf.triggered.connect(self.export_pdf)
         menu_exp.addAction(act_csv); menu_exp.addAction(act_pdf)
+        act_imp = QAction("Import CSV...", self); act_imp.triggered.connect(self.import_csv)
+        menu_exp.addSeparator(); menu_exp.addAction(act_imp)
         btn_exp.setMenu(menu_exp)
         hl.addWidget(btn_exp)
         
         # --- NEW SORTING FEATURE ---
         self.cmb_sort = QComboBox()
         self.cmb_sort.addItems(["Sort by ID (Asc)", "Sort by JLC Stock (Asc)"])
-        self.cmb_sort.currentTextChanged.connect(lambda: self.load_bom()) # Reloads on change
+        self._sort_debounce = QTimer(self); self._sort_debounce.setSingleShot(True); self._sort_debounce.setInterval(200)
+        self._sort_debounce.timeout.connect(self.load_bom)
+        self.cmb_sort.currentTextChanged.connect(lambda: self._sort_debounce.start()) # Reloads on change
         hl.addWidget(QLabel("Sort:"))
         hl.addWidget(self.cmb_sort)
         hl.addSpacing(10)
@@ -439,28 +992,47 @@ class MainWindow(QMainWindow):
 
         # Filter
         self.cmb_f = QComboBox(); self.cmb_f.addItems(CATEGORIES)
-        self.cmb_f.currentTextChanged.connect(self.apply_filter)
+        # Cycling through the combos with the arrow keys / wheel only applies the last choice
+        self._filter_debounce = QTimer(self); self._filter_debounce.setSingleShot(True); self._filter_debounce.setInterval(200)
+        self._filter_debounce.timeout.connect(lambda: self.apply_filter(self.cmb_f.currentText()))
+        self.cmb_f.currentTextChanged.connect(lambda: self._filter_debounce.start())
         hl.addWidget(QLabel("Filter:")); hl.addWidget(self.cmb_f); hl.addSpacing(10)
         
-        bs = QPushButton(qta.icon('fa5s.cog'), ""); bs.clicked.connect(lambda: SettingsDialog(self).exec())
+        bs = QPushButton(_icon('fa5s.cog'), ""); bs.clicked.connect(lambda: SettingsDialog(self).exec())
         hl.addWidget(bs)
-        br = QPushButton(qta.icon('fa5s.sync'), "Refresh"); br.clicked.connect(self.refresh_prices)
+        br = QPushButton(_icon('fa5s.sync'), "Refresh"); br.clicked.connect(lambda: self.refresh_prices())
+        br.setToolTip("Refresh prices older than 24h (right-click rows to force a refresh)")
         hl.addWidget(br)
         rl.addWidget(head)
 
-        # TABLE
-        self.tab = QTableWidget()
-        self.cols = ["ID", "Mouser PN", "JLC Code", "Cat", "Desc", "Qty", "Mouser", "JLCPCB"]
-        self.tab.setColumnCount(len(self.cols)); self.tab.setHorizontalHeaderLabels(self.cols)
+        # TABLE (model -> category filter proxy -> view)
+        self.model = BomTableModel(self._in_flight, self)
+        self.proxy = QSortFilterProxyModel(self); self.proxy.setSourceModel(self.model); self.proxy.setFilterKeyColumn(3)
+        self.tab = QTableView(); self.tab.setModel(self.proxy)
         self.tab.verticalHeader().setVisible(False)
+        # Fixed two-line rows instead of measuring every row's contents
+        self.tab.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.tab.verticalHeader().setDefaultSectionSize(40)
         self.tab.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.tab.doubleClicked.connect(self.edit_component)
-        self.tab.setStyleSheet("QTableWidget{background:#1e1e1e; color:#ddd; gridline-color:#333;}")
-        self.tab.setWordWrap(True)
-        self.tab.setTextElideMode(Qt.TextElideMode.ElideNone)
+        self.tab.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tab.customContextMenuRequested.connect(self.show_table_menu)
+        # Stale rows scrolled into view are refreshed lazily, once scrolling settles
+        self._scroll_timer = QTimer(self); self._scroll_timer.setSingleShot(True); self._scroll_timer.setInterval(300)
+        self._scroll_timer.timeout.connect(self.refresh_visible)
+        # User scrolling only (wheel, arrows, page clicks, dragging): model resets also move the
+        # scrollbar, and opening or re-sorting a project must not start downloads
+        self.tab.verticalScrollBar().actionTriggered.connect(lambda _action: self._scroll_timer.start())
+        self.tab.setStyleSheet("QTableView{background:#1e1e1e; color:#ddd; gridline-color:#333;}")
+        # No wrapping (the vendor cells break lines themselves) and fixed column widths:
+        # ResizeToContents would measure every row of the BOM to size each column
+        self.tab.setWordWrap(False)
+        self.tab.setTextElideMode(Qt.TextElideMode.ElideRight)
         
         header = self.tab.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        for col, width in enumerate([50, 160, 110, 100, 0, 50, 120, 120]):
+            if width: self.tab.setColumnWidth(col, width)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
 
         rl.addWidget(self.tab)
@@ -477,11 +1049,9 @@ class MainWindow(QMainWindow):
         sp.addWidget(right); sp.setSizes([200, 1100])
 
     def get_last_refresh_date(self):
-        dates = []
         if not self.current_project: return "Never"
-        for c in self.current_project.components:
-            if c.last_update: dates.append(c.last_update)
-        return max(dates) if dates else "Never"
+        last = self.session.scalar(select(func.max(Component.last_update)).where(Component.project_id == self.current_project.id))
+        return last or "Never"
 
     def calculate_unit(self, total, qty):
         if qty <= 0: return 0.0
@@ -500,40 +1070,39 @@ class MainWindow(QMainWindow):
         if not self.current_project: return
         NotesDialog(self, self.current_project).exec()
 
+    def export_rows(self):
+        """
+        Columns the exports need, as plain rows (same attribute names as Component)
+        so the per-component loops skip the ORM's instrumented attributes.
+        """
+        return self.session.execute(select(Component.mouser_part_number, Component.jlc_part_number, Component.category,
+                                           Component.description, Component.target_qty,
+                                           Component.last_mouser_stock, Component.last_mouser_price,
+                                           Component.last_jlc_stock, Component.last_jlc_price)
+                                    .where(Component.project_id == self.current_project.id).order_by(Component.id)).all()
+
     def export_csv(self):
         if not self.current_project: return
         path, _ = QFileDialog.getSaveFileName(self, "Save CSV", f"{self.current_project.name}.csv", "CSV Files (*.csv)")
         if path:
             try:
-                with open(path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(["PROJECT", self.current_project.name])
-                    writer.writerow(["GENERATED ON", datetime.now().strftime("%Y-%m-%d %H:%M")])
-                    writer.writerow(["LAST REFRESH", self.get_last_refresh_date()])
-                    writer.writerow([]) 
-                    
-                    headers = ["Mouser PN", "JLC Code", "Category", "Description", "Qty", 
-                               "Mouser Stock", "Mouser Unit (€)", "Mouser Total (€)",
-                               "JLC Stock", "JLC Unit (€)", "JLC Total (€)"]
-                    writer.writerow(headers)
-                    
-                    for c in self.current_project.components:
-                        m_ok = c.last_mouser_stock >= c.target_qty
-                        m_stk = c.last_mouser_stock if c.last_mouser_stock > -1 else "N/A"
-                        m_tot = c.last_mouser_price if m_ok else 0.0
-                        m_unit = self.calculate_unit(m_tot, c.target_qty) if m_ok else 0.0
-                        
-                        j_ok = c.last_jlc_stock >= c.target_qty
-                        j_stk = c.last_jlc_stock if c.last_jlc_stock > -1 else "N/A"
-                        j_tot = c.last_jlc_price if j_ok else 0.0
-                        j_unit = self.calculate_unit(j_tot, c.target_qty) if j_ok else 0.0
-                        
-                        writer.writerow([
-                            c.mouser_part_number, c.jlc_part_number, c.category, c.description, c.target_qty,
-                            m_stk, f"{m_unit:.3f}", f"{m_tot:.2f}",
-                            j_stk, f"{j_unit:.3f}", f"{j_tot:.2f}"
-                        ])
-                QMessageBox.information(self, "Export", "CSV Saved!")
+                calc = self.calculate_unit
+                def vendor(stock, price, qty):
+                    ok = stock >= qty; tot = price if ok else 0.0
+                    return (stock if stock > -1 else "N/A", f"{calc(tot, qty) if ok else 0.0:.3f}", f"{tot:.2f}")
+                rows = [(c.mouser_part_number, c.jlc_part_number, c.category, c.description, c.target_qty,
+                         *vendor(c.last_mouser_stock, c.last_mouser_price, c.target_qty),
+                         *vendor(c.last_jlc_stock, c.last_jlc_price, c.target_qty))
+                        for c in self.export_rows()]
+
+                header = [["PROJECT", self.current_project.name],
+                          ["GENERATED ON", datetime.now().strftime("%Y-%m-%d %H:%M")],
+                          ["LAST REFRESH", self.get_last_refresh_date()],
+                          [],
+                          ["Mouser PN", "JLC Code", "Category", "Description", "Qty",
+                           "Mouser Stock", "Mouser Unit (€)", "Mouser Total (€)",
+                           "JLC Stock", "JLC Unit (€)", "JLC Total (€)"]]
+                self.start_export(ExportWorker(path, rows=header + rows), "CSV Saved!")
             except Exception as e: QMessageBox.critical(self, "Error", str(e))
 
     def export_pdf(self):
@@ -541,8 +1110,8 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "Save PDF", f"{self.current_project.name}.pdf", "PDF Files (*.pdf)")
         if not path: return
 
-        cards_html = ""
-        for c in self.current_project.components:
+        parts = []
+        for c in self.export_rows():
             m_ok = c.last_mouser_stock >= c.target_qty
             j_ok = c.last_jlc_stock >= c.target_qty
             m_stk_style = "color: #2e7d32; font-weight:bold;" if m_ok else "color: #c62828;"
@@ -567,36 +1136,17 @@ class MainWindow(QMainWindow):
             m_border = "2px solid #4caf50" if winner_m else "1px solid #ddd"
             j_border = "2px solid #2196f3" if winner_j else "1px solid #ddd"
 
-            cards_html += f"""
-            <div class="card">
-                <div class="card-header">
-                    <table width="100%">
-                        <tr>
-                            <td width="85%"><div><span class="cat-badge">{c.category}</span> <span class="desc">{c.description}</span></div></td>
-                            <td width="15%" align="right"><div class="qty-line"><b>x{c.target_qty}</b></div></td>
-                        </tr>
-                    </table>
-                </div>
-                <table class="card-body" cellspacing="2">
-                    <tr>
-                        <td width="50%" class="vendor-box" style="background-color: {m_bg}; border: {m_border};">
-                            <div class="row-flex"><span class="v-title" style="color:#2e7d32;">MOUSER</span><span class="pn">{c.mouser_part_number}</span></div>
-                            <div class="metrics-row">Stk: <span style="{m_stk_style}">{m_stk_txt}</span> | Unit: {m_unit}</div>
-                            <div class="total-price">TOT: {m_price}</div>
-                        </td>
-                        <td width="50%" class="vendor-box" style="background-color: {j_bg}; border: {j_border};">
-                            <div class="row-flex"><span class="v-title" style="color:#1565c0;">JLCPCB</span><span class="pn">{c.jlc_part_number}</span></div>
-                            <div class="metrics-row">Stk: <span style="{j_stk_style}">{j_stk_txt}</span> | Unit: {j_unit}</div>
-                            <div class="total-price">TOT: {j_price}</div>
-                        </td>
-                    </tr>
-                </table>
-            </div>
-            """
+            parts.append(PDF_CARD_TEMPLATE % {
+                # User text is escaped so '&' or '<' in a description cannot break the markup
+                'category': html_escape(c.category or ""), 'description': html_escape(c.description or ""), 'qty': c.target_qty,
+                'mouser_pn': html_escape(c.mouser_part_number or ""), 'jlc_pn': html_escape(c.jlc_part_number or ""),
+                'm_bg': m_bg, 'm_border': m_border, 'm_stk_style': m_stk_style, 'm_stk_txt': m_stk_txt, 'm_unit': m_unit, 'm_price': m_price,
+                'j_bg': j_bg, 'j_border': j_border, 'j_stk_style': j_stk_style, 'j_stk_txt': j_stk_txt, 'j_unit': j_unit, 'j_price': j_price})
+        cards_html = "".join(parts)
 
         notes_html = ""
         if self.current_project.notes:
-            notes_html = f"<div class='notes'><h3>Notes:</h3><p>{self.current_project.notes.replace(chr(10), '<br>')}</p></div>"
+            notes_html = f"<div class='notes'><h3>Notes:</h3><p>{html_escape(self.current_project.notes).replace(chr(10), '<br>')}</p></div>"
 
         html_content = f"""
         <html><head><style>
@@ -619,7 +1169,7 @@ class MainWindow(QMainWindow):
             .notes {{ background: #ffffea; border: 1px solid #e0e0a0; padding: 5px; font-size: 9px; }}
         </style></head>
         <body>
-            <h1>BOM: {self.current_project.name}</h1>
+            <h1>BOM: {html_escape(self.current_project.name)}</h1>
             <div class="meta">Generated: {datetime.now().strftime('%d/%m/%Y %H:%M')} | Data updated: {self.get_last_refresh_date()}</div>
             {cards_html}
             <hr>
@@ -627,17 +1177,31 @@ class MainWindow(QMainWindow):
             {notes_html}
         </body></html>
         """
-        try:
-            with open(path, "wb") as pdf_file: pisa_status = pisa.CreatePDF(html_content, dest=pdf_file)
-            if pisa_status.err: QMessageBox.critical(self, "Error", "Error creating PDF")
-            else: QMessageBox.information(self, "Export", "PDF created successfully!")
-        except Exception as e: QMessageBox.critical(self, "Error", str(e))
+        self.start_export(ExportWorker(path, html=html_content), "PDF created successfully!")
+
+    def start_export(self, worker, ok_msg):
+        """
+        Runs the file writing (and the PDF rendering) on the export thread; Export stays disabled,
+        showing that it is busy, until it is done.
+        """
+        self.btn_exp.setEnabled(False); self.btn_exp.setText("Exporting...")
+        worker.signals.done.connect(lambda path, ok, err: self.export_done(ok, err, ok_msg))
+        self.export_pool.start(worker)
+
+    def export_done(self, ok, err, ok_msg):
+        self.btn_exp.setEnabled(True); self.btn_exp.setText("Export")
+        if ok: QMessageBox.information(self, "Export", ok_msg)
+        else: QMessageBox.critical(self, "Error", err)
 
     def load_projects(self):
+        # Refill with updates and signals off so the list repaints once at the end
+        self.p_list.setUpdatesEnabled(False); self.p_list.blockSignals(True)
         self.p_list.clear()
-        for p in self.session.query(Project).all():
-            it = QListWidgetItem(p.name); it.setData(Qt.ItemDataRole.UserRole, p.id)
+        # Only ids and names are needed for the sidebar, no Project objects
+        for p_id, name in self.session.execute(select(Project.id, Project.name).order_by(Project.name)):
+            it = QListWidgetItem(name); it.setData(Qt.ItemDataRole.UserRole, p_id)
             self.p_list.addItem(it)
+        self.p_list.blockSignals(False); self.p_list.setUpdatesEnabled(True)
 
     def add_project(self):
         n, ok = QInputDialog.getText(self, "New", "Name:"); 
@@ -648,10 +1212,12 @@ class MainWindow(QMainWindow):
         if QMessageBox.question(self,"Delete","Are you sure?", QMessageBox.StandardButton.Yes|QMessageBox.StandardButton.No)==QMessageBox.StandardButton.Yes:
             pid = self.p_list.currentItem().data(Qt.ItemDataRole.UserRole)
             self.session.delete(self.session.get(Project, pid)); self.session.commit()
-            self.load_projects(); self.tab.setRowCount(0); self.lbl_t.setText("Select Project")
+            self.current_project = None
+            self.load_projects(); self.model.set_components([]); self.lbl_t.setText("Select Project")
 
     def select_project(self, item):
         pid = item.data(Qt.ItemDataRole.UserRole)
+        # Components are loaded once, sorted, by load_bom
         self.current_project = self.session.get(Project, pid)
         self.lbl_t.setText(self.current_project.name)
         self.load_bom()
@@ -661,46 +1227,35 @@ class MainWindow(QMainWindow):
         Modified to support Sorting.
         """
         if not self.current_project: return
-        self.tab.setRowCount(0)
-        
-        # 1. Fetch components into a list
-        comps = list(self.current_project.components)
         
-        # 2. Sorting Logic
+        # 1. Sorting Logic, done by SQLite
+        q = select(Component).where(Component.project_id == self.current_project.id)
         sort_mode = self.cmb_sort.currentText()
-        if "ID" in sort_mode:
-            comps.sort(key=lambda x: x.id) # Sort by ID ascending
-        elif "JLC Stock" in sort_mode:
+        if "JLC Stock" in sort_mode:
             # Sort by Stock. Note: -1 (N/A) will appear first in ascending order
-            comps.sort(key=lambda x: x.last_jlc_stock)
+            q = q.order_by(Component.last_jlc_stock, Component.id)
+        else:
+            q = q.order_by(Component.id) # Sort by ID ascending
 
-        self.tab.setRowCount(len(comps))
-        for r, c in enumerate(comps): self.render_row(r, c)
+        # 2. Fetch components into a list (already loaded objects are reused from the session);
+        # a scroll still pending from the previous rows is dropped
+        self._scroll_timer.stop()
+        self.model.set_components(self.session.scalars(q).all())
         
         self.apply_filter(self.cmb_f.currentText())
         self.calc_total()
-        self.tab.resizeRowsToContents()
-
-    def render_row(self, r, c):
-        self.tab.setItem(r,0, QTableWidgetItem(str(c.id)))
-        self.tab.setItem(r,1, QTableWidgetItem(c.mouser_part_number))
-        self.tab.setItem(r,2, QTableWidgetItem(c.jlc_part_number))
-        self.tab.setItem(r,3, QTableWidgetItem(c.category))
-        self.tab.setItem(r,4, QTableWidgetItem(c.description))
-        self.tab.setItem(r,5, QTableWidgetItem(str(c.target_qty)))
-        
-        mtxt = "N/A"; mcol = "#777"
-        if c.last_mouser_stock >= c.target_qty: mtxt = f"📦{c.last_mouser_stock}\n{c.last_mouser_price:.2f}€"; mcol = "#aaddaa"
-        elif c.last_mouser_stock > -1: mtxt = f"NO STOCK\n({c.last_mouser_stock})"; mcol = "#ff5555"
-        mi = QTableWidgetItem(mtxt); mi.setForeground(QColor(mcol)); self.tab.setItem(r, 6, mi)
-
-        jtxt = "N/A"; jcol = "#777"
-        if c.last_jlc_stock >= c.target_qty: jtxt = f"📦{c.last_jlc_stock}\n{c.last_jlc_price:.2f}€"; jcol = "#aaddaa"
-        elif c.last_jlc_stock > -1: jtxt = f"NO STOCK\n({c.last_jlc_stock})"; jcol = "#ff5555"
-        ji = QTableWidgetItem(jtxt); ji.setForeground(QColor(jcol)); self.tab.setItem(r, 7, ji)
 
     def apply_filter(self, txt):
-        for r in range(self.tab.rowCount()): self.tab.setRowHidden(r, txt != "All" and self.tab.item(r,3).text() != txt)
+        # Exact category match, evaluated by the proxy in C++; the model reset in
+        # load_bom already refilters, so an unchanged pattern is not set again
+        pattern = "" if txt == "All" else f"^{QRegularExpression.escape(txt)}$"
+        if self.proxy.filterRegularExpression().pattern() != pattern: self.proxy.setFilterRegularExpression(pattern)
+
+    def component_at(self, index):
+        """
+        Component shown at a view (proxy) index.
+        """
+        return self.model.component(self.proxy.mapToSource(index).row())
 
     def add_component(self):
         if not self.current_project: return
@@ -710,10 +1265,43 @@ class MainWindow(QMainWindow):
             self.session.add(Component(project_id=self.current_project.id, mouser_part_number=data['m_pn'], jlc_part_number=data['j_pn'], description=data['desc'], category=data['cat'], target_qty=data['qty'], backup_part=data['backup']))
             self.session.commit(); self.load_bom()
 
+    def add_components_bulk(self, rows):
+        """
+        Inserts many components (dicts of column values) with one executemany,
+        without building an ORM object per row.
+        """
+        if not rows: return
+        self.session.execute(insert(Component), rows); self.session.commit()
+        self.session.expire(self.current_project, ["components"])
+        self.load_bom()
+
+    def import_csv(self):
+        """
+        Adds the components listed in a CSV to the current project.
+        Reads the file written by export_csv: everything above the header row is skipped.
+        """
+        if not self.current_project: return
+        path, _ = QFileDialog.getOpenFileName(self, "Import CSV", "", "CSV Files (*.csv)")
+        if not path: return
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f: lines = list(csv.reader(f))
+            start = next((i for i, r in enumerate(lines) if r[:2] == ["Mouser PN", "JLC Code"]), None)
+            if start is None: QMessageBox.warning(self, "Import", "No 'Mouser PN, JLC Code, ...' header row found."); return
+            rows = []
+            for r in lines[start + 1:]:
+                if not any(r): continue
+                m_pn, j_pn, cat, desc, qty = (r + [""] * 5)[:5]
+                rows.append({'project_id': self.current_project.id, 'mouser_part_number': m_pn.strip(), 'jlc_part_number': j_pn.strip(),
+                             'category': cat if cat in CATEGORY_SET else "Other", 'description': desc,
+                             'target_qty': int(qty) if qty.strip().isdigit() else 1})
+            self.add_components_bulk(rows)
+            QMessageBox.information(self, "Import", f"{len(rows)} components imported!")
+        except Exception as e: QMessageBox.critical(self, "Error", str(e))
+
     def edit_component(self):
-        r = self.tab.currentRow()
-        if r < 0: return
-        c = self.session.get(Component, int(self.tab.item(r,0).text()))
+        idx = self.tab.currentIndex()
+        if not idx.isValid(): return
+        c = self.component_at(idx)
         d = ComponentDialog(self, c)
         if d.exec():
             data = d.get_data()
@@ -722,47 +1310,142 @@ class MainWindow(QMainWindow):
             self.session.commit(); self.load_bom()
 
     def del_component(self):
-        r = self.tab.currentRow()
-        if r >= 0: self.session.delete(self.session.get(Component, int(self.tab.item(r,0).text()))); self.session.commit(); self.load_bom()
-
-    def refresh_prices(self):
+        idx = self.tab.currentIndex()
+        if idx.isValid(): self.session.delete(self.component_at(idx)); self.session.commit(); self.load_bom()
+
+    def show_table_menu(self, pos):
+        if not self.current_project or self.tab.rowAt(pos.y()) < 0: return
+        menu = QMenu(self)
+        act = menu.addAction(_icon('fa5s.sync'), "Refresh Selected")
+        if menu.exec(self.tab.viewport().mapToGlobal(pos)) == act:
+            self.refresh_prices([self.component_at(i) for i in self.tab.selectionModel().selectedRows()], force=True)
+
+    def refresh_visible(self):
+        if not self.current_project or not self.proxy.rowCount(): return
+        first = self.tab.rowAt(0)
+        last = self.tab.rowAt(self.tab.viewport().height() - 1)
+        if last < 0: last = self.proxy.rowCount() - 1
+        comps = []
+        for r in range(max(first, 0), last + 1):
+            c = self.component_at(self.proxy.index(r, 0))
+            if needs_refresh(c): comps.append(c)
+        if comps: self.refresh_prices(comps)
+
+    def refresh_prices(self, components=None, force=False):
+        """
+        Fetches fresh vendor data for the given components.
+        Without a list, only the components whose cached data is stale are refreshed.
+        force=True downloads again instead of using the cached vendor replies.
+        """
         try:
             if not self.current_project: return
-            for r in range(self.tab.rowCount()): self.tab.item(r, 6).setText("Updating..."); self.tab.item(r, 7).setText("Updating...")
-            for c in self.current_project.components:
-                worker = DataUpdater(c.id, c.mouser_part_number, c.jlc_part_number, c.target_qty)
-                worker.signals.result.connect(self.update_db_and_ui)
+            stale_only = components is None
+            # The table already holds every component of the project, freshly queried by load_bom
+            if stale_only: components = [c for c in self.model.components() if needs_refresh(c)]
+            components = [c for c in components if c.id not in self._in_flight]
+            if not components:
+                if stale_only: QMessageBox.information(self, "Refresh", "Nothing to refresh: every price is under 24 hours old, being refreshed,\nor waiting to retry a failed download.")
+                return
+            ids = {c.id for c in components}
+            self._in_flight.update(ids)
+            self.model.refresh_rows(self.model.rows_for_ids(ids))
+            # Snapshot once per batch: workers never touch QSettings or format dates
+            api_key = APP_SETTINGS.value("mouser_key", "").strip()
+            now_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+            self.threadpool.setMaxThreadCount(APP_SETTINGS.value("worker_pool_size", DEFAULT_POOL_SIZE, type=int))
+            groups = {}
+            for c in components: groups.setdefault((c.mouser_part_number, c.jlc_part_number, c.target_qty), []).append(c.id)
+            for (m_pn, j_pn, qty), c_ids in groups.items():
+                worker = DataUpdater(c_ids, m_pn, j_pn, qty, api_key, now_str, self._results, force)
+                self._pending_results += len(c_ids)
                 self.threadpool.start(worker)
         except Exception as e:
             QMessageBox.critical(self, "Error!", str(e))
 
     def update_db_and_ui(self, data):
-        c = self.session.get(Component, data['id'])
+        self._in_flight.discard(data['id'])
+        # Rows of the shown project are already loaded; only stale results from another project go to the session
+        c = self.model.component_by_id(data['id']) or self.session.get(Component, data['id'])
         if c:
-            c.last_mouser_stock = data['mouser_stock']; c.last_mouser_price = data['mouser_price']
-            c.last_jlc_stock = data['jlc_stock']; c.last_jlc_price = data['jlc_price']
-            c.last_update = data['timestamp']
-            self.session.commit()
-            for r in range(self.tab.rowCount()):
-                if self.tab.item(r,0).text() == str(c.id): self.render_row(r, c); break
-        self.calc_total()
-        self.tab.resizeRowsToContents()
+            # None: that vendor's lookup failed, its previous values stay
+            if data['mouser_stock'] is not None: c.last_mouser_stock = data['mouser_stock']; c.last_mouser_price = data['mouser_price']
+            if data['jlc_stock'] is not None: c.last_jlc_stock = data['jlc_stock']; c.last_jlc_price = data['jlc_price']
+            if data['timestamp']: c.last_update = data['timestamp']
+            self._unsaved += 1
+            if self.current_project and c.project_id == self.current_project.id: self.update_total(c)
+            self._dirty_ids.add(c.id)
+            if not self._ui_timer.isActive(): self._ui_timer.start()
+        self._pending_results -= 1
+        if self._pending_results <= 0:
+            # Batch done: one commit, then one repaint and one totals pass
+            self._pending_results = 0
+            self.commit_results()
+            self._ui_timer.stop(); self.flush_ui()
+        elif self._unsaved >= self.COMMIT_BATCH: self.commit_results()
+        elif not self._commit_timer.isActive():
+            self._commit_timer.start()
+
+    def commit_results(self):
+        """
+        Writes every buffered refresh result in one transaction.
+        """
+        self._commit_timer.stop(); self._unsaved = 0
+        self.session.commit()
+
+    def flush_ui(self):
+        """
+        Repaints every row updated since the last flush in a single pass.
+        """
+        if not self._dirty_ids: return
+        self.model.refresh_rows(self.model.rows_for_ids(self._dirty_ids))
+        self._dirty_ids.clear()
+        self.show_totals()
+
+    def closeEvent(self, event):
+        self.commit_results()
+        super().closeEvent(event)
+
+    @staticmethod
+    def contribution(m_stock, m_price, j_stock, j_price, qty):
+        """
+        What one component adds to the Mouser, JLCPCB and hybrid totals.
+        """
+        m_ok = m_stock >= qty
+        j_ok = j_stock >= qty
+        price_m = m_price if m_ok else float('inf')
+        price_j = j_price if j_ok else float('inf')
+        best = min(price_m, price_j)
+        return (m_price if m_ok else 0.0, j_price if j_ok else 0.0, best if best != float('inf') else 0.0)
 
     def calc_total(self):
-        tm = 0.0; tj = 0.0; hybrid_total = 0.0
+        """
+        Full recount, used when the project or its component list changes.
+        """
+        self._contrib = {}
         if self.current_project:
-            for c in self.current_project.components:
-                m_ok = c.last_mouser_stock >= c.target_qty
-                j_ok = c.last_jlc_stock >= c.target_qty
-                if m_ok: tm += c.last_mouser_price
-                if j_ok: tj += c.last_jlc_price
-                price_m = c.last_mouser_price if m_ok else float('inf')
-                price_j = c.last_jlc_price if j_ok else float('inf')
-                best = min(price_m, price_j)
-                if best != float('inf'): hybrid_total += best
-
-        self.tm = tm; self.tj = tj; self.hybrid_total = hybrid_total
-        self.lbl_stat.setText(f"MOUSER: {tm:.2f}€   |   JLCPCB: {tj:.2f}€   |   ⚡ HYBRID (BEST): {hybrid_total:.2f}€")
+            # Plain tuples straight from SQLite, no ORM objects involved
+            rows = self.session.execute(select(Component.id, Component.last_mouser_stock, Component.last_mouser_price,
+                                               Component.last_jlc_stock, Component.last_jlc_price, Component.target_qty)
+                                        .where(Component.project_id == self.current_project.id)).all()
+            contribution = self.contribution
+            self._contrib = {c_id: contribution(*vals) for c_id, *vals in rows}
+
+        shares = self._contrib.values()
+        self.tm = sum(m for m, _, _ in shares); self.tj = sum(j for _, j, _ in shares)
+        self.hybrid_total = sum(h for _, _, h in shares)
+        self.show_totals()
+
+    def update_total(self, c):
+        """
+        Swaps one component's old share of the totals for its new one.
+        """
+        old = self._contrib.get(c.id, (0.0, 0.0, 0.0))
+        new = self.contribution(c.last_mouser_stock, c.last_mouser_price, c.last_jlc_stock, c.last_jlc_price, c.target_qty)
+        self._contrib[c.id] = new
+        self.tm += new[0] - old[0]; self.tj += new[1] - old[1]; self.hybrid_total += new[2] - old[2]
+
+    def show_totals(self):
+        self.lbl_stat.setText(f"MOUSER: {self.tm:.2f}€   |   JLCPCB: {self.tj:.2f}€   |   ⚡ HYBRID (BEST): {self.hybrid_total:.2f}€")
 
 def main():
     app = QApplication(sys.argv)
@@ -777,7 +1460,7 @@ def main():
     p.setColor(QPalette.ColorRole.Highlight, QColor(0, 122, 204)); p.setColor(QPalette.ColorRole.HighlightedText, Qt.GlobalColor.white)
     app.setPalette(p)
 
-    settings = QSettings("MySoft", "BOMManager")
+    settings = APP_SETTINGS
     db_path = settings.value("db_path", "")
     
     if not db_path:
@@ -794,15 +1477,17 @@ def main():
         elif msg.clickedButton() == btn_new:
             file_path, _ = QFileDialog.getSaveFileName(None, "Create New Database", "my_bom_manager.db", "SQLite Database (*.db)")
             if file_path:
-                settings.setValue("db_path", file_path)
-                db_path = file_path
-                with open(db_path, 'w'): pass
+                # Absolute path, so the -wal/-shm sidecars always sit next to the same file
+                db_path = os.path.realpath(file_path)
+                settings.setValue("db_path", db_path)
+                # Append mode creates the file but never truncates an existing database
+                with open(db_path, 'a'): pass
             else: sys.exit(0)
         elif msg.clickedButton() == btn_open:
             file_path, _ = QFileDialog.getOpenFileName(None, "Select Existing Database", "", "SQLite Database (*.db)")
             if file_path:
-                settings.setValue("db_path", file_path)
-                db_path = file_path
+                db_path = os.path.realpath(file_path)
+                settings.setValue("db_path", db_path)
             else: sys.exit(0)
 
     if not os.path.exists(db_path):